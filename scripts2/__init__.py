@@ -17,6 +17,7 @@ CLI entry point:
 __all__ = [
     "config",
     "models",
+    "soa",
     "data_io",
     "geometry",
     "lore_analysis",
@@ -2,13 +2,32 @@
 
 import csv
 import gzip
+import io
 import math
+import os
 import sys
+from itertools import chain
+from multiprocessing import Pool
 from pathlib import Path
-from typing import Dict, Iterable, Set
+from types import MappingProxyType
+from typing import BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
 
 import ijson
 
+try:  # optional: much faster JSON decode for the parallel path
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:  # pragma: no cover - fallback when orjson isn't installed
+    import json
+
+    _loads = json.loads
+
+try:  # optional: multi-threaded gzip decompression
+    import rapidgzip
+except ImportError:  # pragma: no cover - plain gzip is used instead
+    rapidgzip = None
+
 # Import config
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 from config import (
@@ -19,6 +38,51 @@ from config import (
     ALWAYS_KEEP_SYSTEMS,
 )
 
+# Output column order; normalize_system_row() emits tuples in this order.
+FIELDNAMES = (
+    "name",
+    "x",
+    "y",
+    "z",
+    "distance_to_sol",
+    "require_permit",
+    "permit_name",
+    "allegiance",
+    "government",
+    "population",
+    "security",
+    "economy",
+    "primary_star_type",
+    "primary_star_name",
+    "primary_star_is_scoopable",
+    "region_id",
+    "region_name",
+    "category",
+    "tags",
+    "source_flags",
+)
+
+# Number of kept rows encoded and written together in the serial path.
+WRITE_BATCH_SIZE = 4096
+
+# Output file buffer size for the binary CSV writer.
+WRITE_BUFFER_BYTES = 1 << 20
+
+# Number of dump lines handed to each worker process in the parallel path.
+EDSM_CHUNK_LINES = 20000
+
+_intern = sys.intern
+
+# Preformatted strings for the hot boolean / small-population columns, so
+# normalize_system_row() does not allocate a fresh str for each of them.
+_BOOLSTR = {True: "True", False: "False", None: ""}
+_POPULATION_STR = {None: ""}
+_POPULATION_STR.update((i, _intern(str(i))) for i in range(256))
+
+# Shared read-only stand-in for missing "information" / "primaryStar"
+# objects, instead of allocating a fresh empty dict per system.
+_EMPTY = MappingProxyType({})
+
 # -------- Utility functions --------
 
 def distance_to_sol(x: float, y: float, z: float) -> float:
@@ -31,41 +95,45 @@ def load_interesting_system_names() -> Set[str]:
     - Points of Interest (combined sources)
     - Nebulae Coordinates
     - Catalog Systems (named catalog entries)
-    """
-    names: Set[str] = set()
 
+    Names are interned so the many duplicates across the three sheets share
+    one string object, and so the EDSM names (also interned) hit the
+    identity fast path on set membership.
+    """
     poi_file = EDASTRO_RAW_DIR / "points_of_interest.csv"
     nebula_file = EDASTRO_RAW_DIR / "nebulae_coordinates.csv"
     catalog_file = EDASTRO_RAW_DIR / "catalog_systems.csv"
 
-    def safe_read_csv(path: Path) -> Iterable[Dict[str, str]]:
+    def safe_read_csv(path: Path) -> Iterator[Dict[str, str]]:
         if not path.exists():
             print(f"[WARN] EDastro file missing: {path}")
-            return []
+            return
         with path.open("r", encoding="utf-8-sig", newline="") as f:
-            reader = csv.DictReader(f)
-            return list(reader)
-
-    # Points of Interest (combined POI sources) :contentReference[oaicite:6]{index=6}
-    for row in safe_read_csv(poi_file):
-        # EDastro POI CSV has a 'System' column
-        sys_name = (row.get("System") or "").strip()
-        if sys_name:
-            names.add(sys_name)
-
-    # Nebulae Coordinates :contentReference[oaicite:7]{index=7}
-    for row in safe_read_csv(nebula_file):
-        # Usually column 'System' or 'Name'
-        sys_name = (row.get("System") or row.get("Name") or "").strip()
-        if sys_name:
-            names.add(sys_name)
-
-    # Catalog Systems (non-procedural names) :contentReference[oaicite:8]{index=8}
-    for row in safe_read_csv(catalog_file):
-        # Typically 'System' or 'Name' again
-        sys_name = (row.get("System") or row.get("Name") or "").strip()
-        if sys_name:
-            names.add(sys_name)
+            yield from csv.DictReader(f)
+
+    def iter_names(path: Path, *columns: str) -> Iterator[str]:
+        for row in safe_read_csv(path):
+            for col in columns:
+                value = row.get(col)
+                if value:
+                    break
+            sys_name = (value or "").strip()
+            if sys_name:
+                yield _intern(sys_name)
+
+    names: Set[str] = set(
+        chain(
+            # Points of Interest (combined POI sources) :contentReference[oaicite:6]{index=6}
+            # EDastro POI CSV has a 'System' column
+            iter_names(poi_file, "System"),
+            # Nebulae Coordinates :contentReference[oaicite:7]{index=7}
+            # Usually column 'System' or 'Name'
+            iter_names(nebula_file, "System", "Name"),
+            # Catalog Systems (non-procedural names) :contentReference[oaicite:8]{index=8}
+            # Typically 'System' or 'Name' again
+            iter_names(catalog_file, "System", "Name"),
+        )
+    )
 
     print(f"[INFO] Loaded {len(names):,} interesting system names from EDastro.")
     return names
@@ -92,39 +160,59 @@ def iter_edsm_systems(edsm_path: Path):
 def normalize_system_row(
     system: Dict,
     interesting_names: Set[str],
-) -> Dict[str, str]:
+) -> Optional[Tuple[str, ...]]:
     """
     Take one EDSM system object and flatten it into an Omphalos-ready row.
-    """
-    name = system.get("name") or ""
-    name = str(name).strip()
 
-    coords = system.get("coords") or {}
+    The row is a plain tuple in FIELDNAMES order so it can be joined
+    directly by encode_csv_rows() rather than going through DictWriter,
+    which re-walks a dict per row in Python. Returns None for skipped
+    systems.
+    """
+    # Some systems may not have coords; skip those before touching
+    # anything else on the record.
+    coords = system.get("coords")
+    if not coords:
+        return None
     x = coords.get("x")
+    if x is None:
+        return None
     y = coords.get("y")
     z = coords.get("z")
+    if y is None or z is None:
+        return None
 
-    # Some systems may not have coords; skip those
-    if x is None or y is None or z is None:
-        return {}
+    name = _intern(str(system.get("name") or "").strip())
 
     x = float(x)
     y = float(y)
     z = float(z)
     dist = distance_to_sol(x, y, z)
 
+    # Decide whether to keep the system before reading anything else, so
+    # the (majority of) rejected systems cost only the coords/name lookups.
+    keep = (
+        dist <= MAX_RADIUS_LY
+        or name in interesting_names
+        or name in ALWAYS_KEEP_SYSTEMS
+    )
+    if not keep:
+        return None
+
     require_permit = system.get("requirePermit", False)
     permit_name = system.get("permitName")
 
-    information = system.get("information") or {}
-    allegiance = information.get("allegiance")
-    government = information.get("government")
+    # These are small enums repeated across millions of systems; interning
+    # keeps a single copy of each instead of one fresh str per row.
+    information = system.get("information") or _EMPTY
+    allegiance = _intern(information.get("allegiance") or "")
+    government = _intern(information.get("government") or "")
     population = information.get("population")
-    security = information.get("security")
-    economy = information.get("economy")
+    security = _intern(information.get("security") or "")
+    economy = _intern(information.get("economy") or "")
 
-    primary_star = system.get("primaryStar") or {}
-    star_type = primary_star.get("type")
+    primary_star = system.get("primaryStar") or _EMPTY
+    star_type = _intern(primary_star.get("type") or "")
     star_name = primary_star.get("name")
     is_scoopable = primary_star.get("isScoopable")
 
@@ -137,46 +225,203 @@ def normalize_system_row(
     category = ""
     tags = ""
 
-    is_interesting = name in interesting_names or name in ALWAYS_KEEP_SYSTEMS
-    within_radius = dist <= MAX_RADIUS_LY
+    pop_str = _POPULATION_STR.get(population)
+    if pop_str is None:
+        pop_str = str(population)
+
+    return (
+        name,
+        f"{x:.6f}",
+        f"{y:.6f}",
+        f"{z:.6f}",
+        f"{dist:.3f}",
+        _BOOLSTR[bool(require_permit)],
+        permit_name or "",
+        allegiance or "",
+        government or "",
+        pop_str,
+        security or "",
+        economy or "",
+        star_type or "",
+        star_name or "",
+        _BOOLSTR[None if is_scoopable is None else bool(is_scoopable)],
+        region_id,
+        region_name,
+        category,
+        tags,
+        "edsm",
+    )
+
+
+def encode_csv_rows(rows: List[Tuple[str, ...]]) -> bytes:
+    """
+    Encode rows as UTF-8 CSV bytes, identical to csv.writer's default dialect.
 
-    keep = is_interesting or within_radius or name in ALWAYS_KEEP_SYSTEMS
+    Almost no EDSM field needs quoting, so the block is joined directly and
+    checked once: if the separator and line-break counts are exactly what
+    the row/field counts imply and there are no quote characters, the joined
+    text is already valid CSV. Otherwise the block goes through csv.writer.
+    """
+    if not rows:
+        return b""
+    n = len(rows)
+    text = "\r\n".join(map(",".join, rows)) + "\r\n"
+    if (
+        text.count(",") == n * (len(rows[0]) - 1)
+        and text.count("\n") == n
+        and text.count("\r") == n
+        and '"' not in text
+    ):
+        return text.encode("utf-8")
+
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    return buf.getvalue().encode("utf-8")
+
+
+def iter_edsm_line_chunks(
+    edsm_path: Path,
+    workers: int,
+    chunk_lines: int = EDSM_CHUNK_LINES,
+) -> Iterator[List[bytes]]:
+    """
+    Read the decompressed EDSM dump as blocks of raw lines.
 
-    if not keep:
-        return {}
-
-    row = {
-        "name": name,
-        "x": f"{x:.6f}",
-        "y": f"{y:.6f}",
-        "z": f"{z:.6f}",
-        "distance_to_sol": f"{dist:.3f}",
-        "require_permit": str(bool(require_permit)),
-        "permit_name": permit_name or "",
-        "allegiance": allegiance or "",
-        "government": government or "",
-        "population": str(population) if population is not None else "",
-        "security": security or "",
-        "economy": economy or "",
-        "primary_star_type": star_type or "",
-        "primary_star_name": star_name or "",
-        "primary_star_is_scoopable": (
-            "" if is_scoopable is None else str(bool(is_scoopable))
-        ),
-        "region_id": region_id,
-        "region_name": region_name,
-        "category": category,
-        "tags": tags,
-        "source_flags": "edsm",
-    }
-    return row
-
-
-def build_omphalos_systems():
+    The nightly dump is written one system object per line (between the
+    opening "[" and closing "]"), so line-aligned blocks can be parsed
+    independently. Uses rapidgzip when it is installed, plain gzip
+    otherwise; decompression stays on one thread, as the worker pool
+    already occupies the other cores.
+    """
+    if not edsm_path.exists():
+        raise FileNotFoundError(f"EDSM dump not found: {edsm_path}")
+    print(f"[INFO] Streaming systems from {edsm_path} ({workers} workers)")
+
+    if rapidgzip is not None:
+        f = io.BufferedReader(
+            rapidgzip.open(str(edsm_path), parallelization=1),
+            buffer_size=1 << 20,
+        )
+    else:
+        f = gzip.open(edsm_path, "rb")
+
+    with f:
+        chunk: List[bytes] = []
+        for line in f:
+            chunk.append(line)
+            if len(chunk) >= chunk_lines:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+_worker_interesting_names: Set[str] = set()
+
+
+def _init_worker(interesting_names: Set[str]) -> None:
+    global _worker_interesting_names
+    _worker_interesting_names = interesting_names
+
+
+def _normalize_line_chunk(lines: List[bytes]) -> Tuple[int, int, bytes]:
+    """
+    Worker: parse one block of dump lines.
+
+    Returns (systems_seen, rows_kept, csv_bytes) so the CSV encoding also
+    happens in the worker. Raises ValueError when a line is not a whole
+    system object, i.e. the dump is not laid out one system per line.
+    """
+    seen = 0
+    rows: List[Tuple[str, ...]] = []
+    for line in lines:
+        line = line.strip().rstrip(b",")
+        if not line or line == b"[" or line == b"]":
+            continue
+        seen += 1
+        try:
+            system = _loads(line)
+        except ValueError as exc:
+            # Re-raised as a plain ValueError so it pickles back to the parent.
+            raise ValueError(f"not one system per line: {exc}") from None
+        if not isinstance(system, dict):
+            raise ValueError("not one system per line")
+        row = normalize_system_row(system, _worker_interesting_names)
+        if row:
+            rows.append(row)
+    return seen, len(rows), encode_csv_rows(rows)
+
+
+def iter_kept_row_batches(
+    edsm_path: Path,
+    interesting_names: Set[str],
+    workers: int,
+) -> Iterator[Tuple[int, int, bytes]]:
+    """
+    Yield (systems_seen, rows_kept, csv_bytes) blocks in dump order.
+
+    With workers > 1 the dump is split into line blocks that are parsed and
+    filtered in a process pool; otherwise it is streamed through ijson in
+    this process.
+    """
+    if workers > 1:
+        with Pool(
+            workers,
+            initializer=_init_worker,
+            initargs=(interesting_names,),
+        ) as pool:
+            yield from pool.imap(
+                _normalize_line_chunk,
+                iter_edsm_line_chunks(edsm_path, workers),
+            )
+        return
+
+    seen = 0
+    batch: List[Tuple[str, ...]] = []
+    for system in iter_edsm_systems(edsm_path):
+        seen += 1
+        row = normalize_system_row(system, interesting_names)
+        if row:
+            batch.append(row)
+            if len(batch) >= WRITE_BATCH_SIZE:
+                yield seen, len(batch), encode_csv_rows(batch)
+                seen = 0
+                batch = []
+    if seen:
+        yield seen, len(batch), encode_csv_rows(batch)
+
+
+def _write_systems_csv(
+    f_out: BinaryIO,
+    edsm_path: Path,
+    interesting_names: Set[str],
+    workers: int,
+) -> int:
+    """Write the header and all kept rows to *f_out*; return the rows kept."""
+    total_seen = 0
+    total_kept = 0
+    next_report = 100000
+
+    f_out.write(encode_csv_rows([FIELDNAMES]))
+    for seen, kept, data in iter_kept_row_batches(edsm_path, interesting_names, workers):
+        f_out.write(data)
+        total_seen += seen
+        total_kept += kept
+
+        if total_seen >= next_report:
+            print(f"[INFO] Processed {total_seen:,} systems, kept {total_kept:,}...")
+            next_report = (total_seen // 100000 + 1) * 100000
+    return total_kept
+
+
+def build_omphalos_systems(workers: Optional[int] = None):
     """
     Main pipeline:
     - Load interesting names from EDastro
-    - Stream EDSM nightly dump
+    - Stream EDSM nightly dump (in parallel across *workers* processes;
+      defaults to one less than the CPU count, 1 keeps everything
+      in-process; falls back to the in-process stream if the dump is not
+      one system per line)
     - Keep systems within radius or with interesting names
     - Write omphalos_systems.csv
     """
@@ -186,44 +431,20 @@ def build_omphalos_systems():
     interesting_names = load_interesting_system_names()
     edsm_path = EDSM_RAW_DIR / "systemsWithCoordinates.json.gz"
 
-    total_kept = 0
-
-    fieldnames = [
-        "name",
-        "x",
-        "y",
-        "z",
-        "distance_to_sol",
-        "require_permit",
-        "permit_name",
-        "allegiance",
-        "government",
-        "population",
-        "security",
-        "economy",
-        "primary_star_type",
-        "primary_star_name",
-        "primary_star_is_scoopable",
-        "region_id",
-        "region_name",
-        "category",
-        "tags",
-        "source_flags",
-    ]
+    if workers is None:
+        workers = max(1, (os.cpu_count() or 1) - 1)
 
     print(f"[INFO] Writing {out_path}")
-    with out_path.open("w", encoding="utf-8", newline="") as f_out:
-        writer = csv.DictWriter(f_out, fieldnames=fieldnames)
-        writer.writeheader()
-
-        for idx, system in enumerate(iter_edsm_systems(edsm_path), start=1):
-            row = normalize_system_row(system, interesting_names)
-            if row:
-                writer.writerow(row)
-                total_kept += 1
-
-            if idx % 100000 == 0:
-                print(f"[INFO] Processed {idx:,} systems, kept {total_kept:,}...")
+    with out_path.open("wb", buffering=WRITE_BUFFER_BYTES) as f_out:
+        try:
+            total_kept = _write_systems_csv(f_out, edsm_path, interesting_names, workers)
+        except ValueError as exc:
+            if workers <= 1:
+                raise
+            print(f"[WARN] {exc}; restarting with the ijson stream")
+            f_out.seek(0)
+            f_out.truncate()
+            total_kept = _write_systems_csv(f_out, edsm_path, interesting_names, 1)
 
     print(f"[DONE] Kept {total_kept:,} systems -> {out_path}")
 
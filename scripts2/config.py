@@ -16,6 +16,9 @@ LORE_DIR = DATA_DIR / "lore_samples"
 # Witch-space jump log
 WITCHSPACE_LOG = DATA_DIR / "witchspace_jumps.jsonl"
 
+# On-disk cache of EDSM system lookups
+EDSM_CACHE = DATA_DIR / "edsm_cache.sqlite"
+
 # Visualization JSON outputs
 OMPHALOS_VIZ_JSON = DATA_DIR / "omphalos_map.json"
 GUARDIAN_VIZ_JSON = DATA_DIR / "guardian_map.json"
@@ -55,9 +55,8 @@ def write_systems_csv(path: Path, systems: Iterable[SystemNode]) -> None:
             )
 
 
-def append_jump_event(path: Path, event: JumpEvent) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    data = {
+def _jump_event_record(event: JumpEvent) -> dict:
+    return {
         "timestamp_utc": event.timestamp_utc,
         "origin": event.origin,
         "destination": event.destination,
@@ -72,8 +71,24 @@ def append_jump_event(path: Path, event: JumpEvent) -> None:
         "anomaly_duration": event.anomaly_duration,
         "extra": event.extra,
     }
+
+
+def append_jump_event(path: Path, event: JumpEvent) -> None:
+    append_jump_events(path, (event,))
+
+
+def append_jump_events(path: Path, events: Iterable[JumpEvent]) -> int:
+    """Append several events to the JSONL log with a single open/write.
+
+    Returns the number of events written.
+    """
+    lines = [json.dumps(_jump_event_record(e)) + "\n" for e in events]
+    if not lines:
+        return 0
+    path.parent.mkdir(parents=True, exist_ok=True)
     with path.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(data) + "\n")
+        f.write("".join(lines))
+    return len(lines)
 
 
 def load_jump_events(path: Path) -> List[JumpEvent]:
@@ -1,9 +1,15 @@
 from __future__ import annotations
 import math
 from dataclasses import dataclass
-from typing import List, Tuple, Dict
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+
+import numpy as np
+
+from scipy.spatial import cKDTree
+from scipy.spatial.distance import pdist
 
 from .models import SystemNode
+from .soa import SystemArray
 from .config import DISTANCE_EPSILON, COLINEAR_EPSILON
 
 
@@ -14,6 +20,29 @@ class DistanceRecord:
     distance: float
 
 
+@dataclass
+class DistanceMatrix:
+    """
+    Pairwise distances as parallel arrays: pair m joins rows i[m] and j[m]
+    (indices into names) at distance d[m].
+
+    Iterating yields DistanceRecord objects one at a time, for callers that
+    want the record API.
+    """
+    names: np.ndarray  # (N,) object, system name per row
+    i: np.ndarray      # (M,) intp
+    j: np.ndarray      # (M,) intp
+    d: np.ndarray      # (M,) float64
+
+    def __len__(self) -> int:
+        return len(self.d)
+
+    def __iter__(self) -> Iterator[DistanceRecord]:
+        names = self.names
+        for a, b, dist in zip(self.i.tolist(), self.j.tolist(), self.d.tolist()):
+            yield DistanceRecord(a=names[a], b=names[b], distance=dist)
+
+
 def distance(a: SystemNode, b: SystemNode) -> float:
     if not a.has_coords() or not b.has_coords():
         raise ValueError("Both systems must have coordinates for distance()")
@@ -25,33 +54,147 @@ def distance(a: SystemNode, b: SystemNode) -> float:
     return math.sqrt(dx * dx + dy * dy + dz * dz)
 
 
-def compute_all_pair_distances(systems: List[SystemNode]) -> List[DistanceRecord]:
-    coords_systems = [s for s in systems if s.has_coords()]
-    out: List[DistanceRecord] = []
-    for i in range(len(coords_systems)):
-        for j in range(i + 1, len(coords_systems)):
-            d = distance(coords_systems[i], coords_systems[j])
-            out.append(
-                DistanceRecord(
-                    a=coords_systems[i].name,
-                    b=coords_systems[j].name,
-                    distance=d,
-                )
-            )
-    return out
+# Number of pairs processed per block in nearest_neighbor_indices();
+# bounds the size of the temporaries for large system lists.
+_PAIR_BLOCK = 1 << 20
+
+
+def _pair_distances(P: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Distances for every unordered pair of rows in *P*.
+
+    Returns (i, j, d) with i < j in the same order as the nested i/j loop.
+    The distances come from SciPy's pdist and agree with distance() to within
+    rounding (the last bit can differ, depending on the SciPy build).
+    """
+    i, j = np.triu_indices(len(P), 1)
+    return i, j, pdist(P, "euclidean")
+
+
+def _as_system_array(systems: Union[List[SystemNode], SystemArray]) -> SystemArray:
+    if isinstance(systems, SystemArray):
+        return systems
+    return SystemArray.from_nodes(systems)
+
+
+def pair_distance_arrays(arr: SystemArray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Distances between every pair of systems in *arr* that have coordinates.
+
+    Returns (i, j, d): row indices into *arr* (i before j, in the order of
+    the nested i/j loop) and the distances.
+    """
+    rows = arr.coord_rows()
+    i, j, d = _pair_distances(arr.xyz[rows])
+    return rows[i], rows[j], d
+
+
+def compute_all_pair_distances(systems: Union[List[SystemNode], SystemArray]
+                               ) -> DistanceMatrix:
+    """
+    Distances between every pair of systems that have coordinates.
+
+    The distances are computed in one vectorised call and kept as arrays;
+    DistanceRecord objects are only built if the result is iterated.
+    """
+    arr = _as_system_array(systems)
+    i, j, d = pair_distance_arrays(arr)
+    return DistanceMatrix(names=arr.names, i=i, j=j, d=d)
+
+
+def nearest_neighbor_indices(P: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    For each row of the (N, 3) array *P*, the indices of and distances to its
+    *k* nearest other rows, nearest first (ties keep row order).
+
+    Distances are evaluated in row blocks with the same arithmetic as
+    distance(), so callers that used to loop over distance() get identical
+    values without a Python call per pair.
+    """
+    n = len(P)
+    k = min(k, n - 1)
+    if k <= 0:
+        return np.empty((n, 0), dtype=np.intp), np.empty((n, 0), dtype=np.float64)
+
+    idx = np.empty((n, k), dtype=np.intp)
+    dist = np.empty((n, k), dtype=np.float64)
+    rows = max(1, _PAIR_BLOCK // n)
+    for start in range(0, n, rows):
+        B = P[start:start + rows]
+        diff = B[:, None, :] - P[None, :, :]
+        dx, dy, dz = diff[..., 0], diff[..., 1], diff[..., 2]
+        D = np.sqrt(dx * dx + dy * dy + dz * dz)
+        D[np.arange(len(B)), np.arange(start, start + len(B))] = np.inf  # skip self
+        order = np.argsort(D, axis=1, kind="stable")[:, :k]
+        idx[start:start + len(B)] = order
+        dist[start:start + len(B)] = np.take_along_axis(D, order, axis=1)
+    return idx, dist
+
+
+def group_repeated_distance_indices(a_idx: np.ndarray, b_idx: np.ndarray, d: np.ndarray,
+                                    tol: float = DISTANCE_EPSILON
+                                    ) -> Dict[float, np.ndarray]:
+    """
+    Array version of group_repeated_distances().
 
+    Takes parallel (a_idx, b_idx, d) arrays, e.g. from pair_distance_arrays(),
+    and returns representative distance -> (K, 2) array of (a, b) index
+    pairs, for buckets with more than one pair. Buckets come out in order of
+    first appearance and pairs keep their input order.
+    """
+    d = np.asarray(d, dtype=np.float64)
+    if not len(d):
+        return {}
+    keys = np.round(d / tol).astype(np.int64)
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    counts = np.diff(np.r_[starts, len(sorted_keys)])
+    uniq = sorted_keys[starts]
+
+    repeated = np.flatnonzero(counts > 1)
+    # Buckets are sorted by key; reorder by first occurrence instead.
+    repeated = repeated[np.argsort(order[starts[repeated]], kind="stable")]
+
+    # Reorder the pairs by bucket once; each group is then a slice of it.
+    ab = np.stack([np.asarray(a_idx), np.asarray(b_idx)], axis=1)[order]
+    return {
+        key * tol: ab[start:start + count]
+        for key, start, count in zip(uniq[repeated].tolist(),
+                                     starts[repeated].tolist(),
+                                     counts[repeated].tolist())
+    }
 
-def group_repeated_distances(distances_list: List[DistanceRecord], tol: float = DISTANCE_EPSILON
+
+def group_repeated_distances(distances_list: Union[DistanceMatrix, Iterable[DistanceRecord]],
+                             tol: float = DISTANCE_EPSILON
                              ) -> Dict[float, List[Tuple[str, str]]]:
     """
     Group pairs with approximately equal distances, rounded to a tolerance.
     Returns mapping of representative distance -> list of (systemA, systemB).
     """
-    buckets: Dict[float, List[Tuple[str, str]]] = {}
+    if isinstance(distances_list, DistanceMatrix):
+        names = distances_list.names
+        groups = group_repeated_distance_indices(
+            distances_list.i, distances_list.j, distances_list.d, tol)
+        return {
+            key: list(map(tuple, names[pairs].tolist()))
+            for key, pairs in groups.items()
+        }
+
+    a_names: List[str] = []
+    b_names: List[str] = []
+    dists: List[float] = []
     for rec in distances_list:
-        key = round(rec.distance / tol) * tol
-        buckets.setdefault(key, []).append((rec.a, rec.b))
-    return {k: v for k, v in buckets.items() if len(v) > 1}
+        a_names.append(rec.a)
+        b_names.append(rec.b)
+        dists.append(rec.distance)
+    idx = np.arange(len(dists))
+    groups = group_repeated_distance_indices(idx, idx, np.array(dists, dtype=np.float64), tol)
+    return {
+        key: [(a_names[m], b_names[m]) for m in pairs[:, 0].tolist()]
+        for key, pairs in groups.items()
+    }
 
 
 def triangle_area(a: Tuple[float, float, float],
@@ -71,64 +214,215 @@ def triangle_area(a: Tuple[float, float, float],
     return area
 
 
+_np_fma = getattr(np, "fma", None)
+
+
+def _two_product(a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Error-free product: a * b == p + e exactly (Dekker / Veltkamp split)."""
+    p = a * b
+    t = 134217729.0 * a  # 2**27 + 1
+    a_hi = t - (t - a)
+    a_lo = a - a_hi
+    t = 134217729.0 * b
+    b_hi = t - (t - b)
+    b_lo = b - b_hi
+    e = ((a_hi * b_hi - p) + a_hi * b_lo + a_lo * b_hi) + a_lo * b_lo
+    return p, e
+
+
+def _diff_of_products(a: np.ndarray, b: np.ndarray,
+                      c: np.ndarray, d: np.ndarray) -> np.ndarray:
+    """
+    a * b - c * d without the cancellation error of the naive form.
+
+    Uses Kahan's fma formulation when NumPy provides fma, otherwise the
+    equivalent error-free products.
+    """
+    if _np_fma is not None:
+        w = c * d
+        return _np_fma(a, b, -w) + _np_fma(-c, d, w)
+    p1, e1 = _two_product(a, b)
+    p2, e2 = _two_product(c, d)
+    return (p1 - p2) + (e1 - e2)
+
+
+def _cross_stable(ab: np.ndarray, ac: np.ndarray) -> np.ndarray:
+    """Cross product of (..., 3) arrays, each component via _diff_of_products."""
+    return np.stack(
+        [
+            _diff_of_products(ab[..., 1], ac[..., 2], ab[..., 2], ac[..., 1]),
+            _diff_of_products(ab[..., 2], ac[..., 0], ab[..., 0], ac[..., 2]),
+            _diff_of_products(ab[..., 0], ac[..., 1], ab[..., 1], ac[..., 0]),
+        ],
+        axis=-1,
+    )
+
+
+def triangle_area_batch(a: np.ndarray, b: np.ndarray, c: np.ndarray) -> np.ndarray:
+    """
+    Vectorised triangle_area() over rows of (K, 3) arrays (broadcasts).
+
+    The cross product is evaluated with compensated products, so areas of
+    nearly colinear triples -- the case find_colinear_triplets cares about --
+    are not swamped by rounding error.
+    """
+    cross = _cross_stable(b - a, c - a)
+    return 0.5 * np.linalg.norm(cross, axis=-1)
+
+
+def _colinear_candidates(origin: np.ndarray, Q: np.ndarray, eps: float
+                         ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Candidate pairs (j, k), j < k, of rows of *Q* that may form a triangle
+    of area < eps with *origin*.
+
+    The area is 0.5 * r_j * r_k * sin(theta), with theta the angle between
+    the two directions folded to [0, 90] degrees (the origin may sit between
+    the two points). For theta in that range the chord between the unit
+    vectors is at most sqrt(2) * sin(theta), so a pair can only qualify if
+    the chord -- and therefore the x-component gap -- is within
+    2 * sqrt(2) * eps / min(r_j, r_k)**2. Sorting the x-components of the
+    directions and their antipodes turns that into a sweep with
+    searchsorted. The result is a superset; callers check the exact area.
+    """
+    m = len(Q)
+    V = Q - origin
+    r = np.sqrt((V * V).sum(axis=1))
+    zero = r == 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        U = V / r[:, None]
+        rho = (2.0 * math.sqrt(2.0) * eps) / (r * r)
+    # A point on top of the origin is colinear with everything.
+    U[zero] = 0.0
+    rho[zero] = np.inf
+    rho = rho * (1.0 + 1e-9) + 1e-12  # slack for rounding in U / r
+
+    ux = np.concatenate([U[:, 0], -U[:, 0]])
+    order = np.argsort(ux, kind="stable")
+    xs = ux[order]
+    lo = np.searchsorted(xs, U[:, 0] - rho, side="left")
+    hi = np.searchsorted(xs, U[:, 0] + rho, side="right")
+    counts = hi - lo
+    total = int(counts.sum())
+    if total == 0:
+        empty = np.empty(0, dtype=np.intp)
+        return empty, empty
+
+    jj = np.repeat(np.arange(m), counts)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    kk = order[np.repeat(lo, counts) + offsets] % m
+    mask = jj != kk
+    lo_idx = np.minimum(jj, kk)[mask]
+    hi_idx = np.maximum(jj, kk)[mask]
+    key = np.unique(lo_idx * m + hi_idx)
+    return key // m, key % m
+
+
+def colinear_triplet_indices(arr: SystemArray, eps: float = COLINEAR_EPSILON
+                             ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Row indices (i, j, k), i < j < k, of systems in *arr* forming triangles
+    of area < eps, in lexicographic order.
+
+    For each anchor system the directions to the later systems are swept in
+    sorted order to shortlist pairs that can possibly be colinear with it
+    (see _colinear_candidates), and only the shortlist gets the exact
+    triangle-area test.
+    """
+    rows = arr.coord_rows()
+    P = arr.xyz[rows]
+    out_i, out_j, out_k = [], [], []
+    for i in range(len(P) - 2):
+        j, k = _colinear_candidates(P[i], P[i + 1:], eps)
+        if not len(j):
+            continue
+        j += i + 1
+        k += i + 1
+        keep = triangle_area_batch(P[i], P[j], P[k]) < eps
+        out_i.append(np.full(int(keep.sum()), i, dtype=np.intp))
+        out_j.append(j[keep])
+        out_k.append(k[keep])
+    if not out_i:
+        empty = np.empty(0, dtype=np.intp)
+        return empty, empty, empty
+    return (rows[np.concatenate(out_i)], rows[np.concatenate(out_j)],
+            rows[np.concatenate(out_k)])
+
+
 def find_colinear_triplets(systems: List[SystemNode],
                            eps: float = COLINEAR_EPSILON) -> List[Tuple[SystemNode, SystemNode, SystemNode]]:
     """
     Rough detection of triplets of systems forming nearly straight lines.
+
+    Results match the brute-force triple loop, in the same order; see
+    colinear_triplet_indices() for the SystemArray version.
     """
-    coords_systems = [s for s in systems if s.has_coords()]
-    triplets: List[Tuple[SystemNode, SystemNode, SystemNode]] = []
-    n = len(coords_systems)
-    for i in range(n):
-        for j in range(i + 1, n):
-            for k in range(j + 1, n):
-                a = coords_systems[i]
-                b = coords_systems[j]
-                c = coords_systems[k]
-                area = triangle_area(a.coords(), b.coords(), c.coords())
-                if area < eps:
-                    triplets.append((a, b, c))
-    return triplets
+    i, j, k = colinear_triplet_indices(SystemArray.from_nodes(systems), eps)
+    return [(systems[a], systems[b], systems[c])
+            for a, b, c in zip(i.tolist(), j.tolist(), k.tolist())]
 
 
-def find_radial_spokes(systems: List[SystemNode],
-                       center_name: str,
-                       angle_tolerance_deg: float = 1.0
-                       ) -> List[Tuple[SystemNode, SystemNode]]:
+def _spoke_pairs(U: np.ndarray, cos_tol: float) -> Tuple[np.ndarray, np.ndarray]:
     """
-    Given a 'center' system (e.g. Sol, Polaris, HIP 22460),
-    find pairs of systems that line up in nearly the same direction from that center.
+    (i, j) index arrays, i < j in lexicographic order, of unit rows of *U*
+    with dot >= cos_tol.
+
+    On the unit sphere the chord length sqrt(2 * (1 - dot)) is monotone in
+    the angle, so the pairs are the ones within that chord of each other; a
+    KD-tree finds them without comparing every pair. The radius gets a
+    little slack and the dot product is re-checked exactly, so rounding in
+    the tree's distances cannot drop or add a pair at the boundary.
+    """
+    if len(U) < 2:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    r = math.sqrt(max(2.0 * (1.0 - cos_tol), 0.0)) + 1e-6
+    pairs = cKDTree(U).query_pairs(r, output_type="ndarray")
+    i, j = pairs[:, 0], pairs[:, 1]
+    dot = U[i, 0] * U[j, 0] + U[i, 1] * U[j, 1] + U[i, 2] * U[j, 2]
+    keep = dot >= cos_tol
+    i, j = i[keep], j[keep]
+    order = np.lexsort((j, i))
+    return i[order], j[order]
+
+
+def radial_spoke_indices(arr: SystemArray,
+                         center_name: str,
+                         angle_tolerance_deg: float = 1.0
+                         ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Row indices (i, j), i < j, of systems in *arr* that lie in nearly the
+    same direction from the system named *center_name*.
     """
-    lookup = {s.name: s for s in systems}
-    if center_name not in lookup:
+    matches = np.flatnonzero(arr.names == center_name)
+    if not len(matches):
         raise ValueError(f"Center system '{center_name}' not found in systems list")
 
-    center = lookup[center_name]
-    if not center.has_coords():
+    # Last system with that name wins, as with a name -> node dict.
+    center = matches[-1]
+    if not arr.coord_mask[center]:
         raise ValueError(f"Center system '{center_name}' has no coordinates")
 
-    cx, cy, cz = center.coords()
-
-    vectors = []
-    for s in systems:
-        if s.name == center_name or not s.has_coords():
-            continue
-        x, y, z = s.coords()
-        vx = x - cx
-        vy = y - cy
-        vz = z - cz
-        mag = math.sqrt(vx * vx + vy * vy + vz * vz)
-        if mag == 0:
-            continue
-        vectors.append((s, (vx / mag, vy / mag, vz / mag)))
+    rows = np.flatnonzero(arr.coord_mask & (arr.names != center_name))
+    V = arr.xyz[rows] - arr.xyz[center]
+    vx, vy, vz = V[:, 0], V[:, 1], V[:, 2]
+    mag = np.sqrt(vx * vx + vy * vy + vz * vz)
+    nonzero = mag != 0
+    U = np.ascontiguousarray(V[nonzero] / mag[nonzero, None])
+    rows = rows[nonzero]
 
-    spokes: List[Tuple[SystemNode, SystemNode]] = []
     cos_tol = math.cos(math.radians(angle_tolerance_deg))
-    for i in range(len(vectors)):
-        s1, v1 = vectors[i]
-        for j in range(i + 1, len(vectors)):
-            s2, v2 = vectors[j]
-            dot = v1[0] * v2[0] + v1[1] * v2[1] + v1[2] * v2[2]
-            if dot >= cos_tol:
-                spokes.append((s1, s2))
-    return spokes
+    i, j = _spoke_pairs(U, cos_tol)
+    return rows[i], rows[j]
+
+
+def find_radial_spokes(systems: List[SystemNode],
+                       center_name: str,
+                       angle_tolerance_deg: float = 1.0
+                       ) -> List[Tuple[SystemNode, SystemNode]]:
+    """
+    Given a 'center' system (e.g. Sol, Polaris, HIP 22460),
+    find pairs of systems that line up in nearly the same direction from that center.
+    """
+    i, j = radial_spoke_indices(SystemArray.from_nodes(systems), center_name,
+                                angle_tolerance_deg)
+    return [(systems[a], systems[b]) for a, b in zip(i.tolist(), j.tolist())]
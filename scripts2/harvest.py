@@ -11,17 +11,37 @@ or the web GUI.
 
 import json
 import logging
+import mmap
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import Optional, Tuple, List, Dict, Any
+from typing import Optional, Tuple, List, Dict, Any, Callable, Iterator
 
 import requests
+from requests.adapters import HTTPAdapter
 
-from .config import SYSTEMS_CSV, DATA_DIR, LORE_DIR, WITCHSPACE_LOG
+try:  # optional: faster JSON for journals, EDSM responses and the lore index
+    import orjson
+
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+except ImportError:  # pragma: no cover - stdlib json is used instead
+    _loads = json.loads
+
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+from .config import SYSTEMS_CSV, DATA_DIR, LORE_DIR, WITCHSPACE_LOG, EDSM_CACHE
 from .data_io import (
     load_systems_csv,
     write_systems_csv,
     load_jump_events,
-    append_jump_event,
+    append_jump_events,
     load_lore_file,
 )
 from .models import SystemNode, JumpEvent, LoreText
@@ -31,60 +51,193 @@ log = logging.getLogger(__name__)
 
 EDSM_BASE = "https://www.edsm.net/api-v1"
 
+# Batched EDSM lookups: names per /systems request, concurrent requests,
+# and the minimum spacing (seconds) between request starts.
+EDSM_BATCH_SIZE = 50
+EDSM_MAX_WORKERS = 8
+EDSM_RATE_LIMIT_S = 0.5
+
+# How long cached EDSM answers stay valid (30 days).
+EDSM_CACHE_TTL_S = 30 * 24 * 3600
+
+
+def make_http_session() -> requests.Session:
+    """A keep-alive session with a connection pool sized for EDSM_MAX_WORKERS."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=EDSM_MAX_WORKERS, pool_maxsize=EDSM_MAX_WORKERS)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# Shared keep-alive session so repeated EDSM calls reuse connections; callers
+# that hold their own session (e.g. the web app) can pass it in instead.
+_session = make_http_session()
+
 
 # ---------------------------------------------------------------------------
 # EDSM system coordinate harvest
 # ---------------------------------------------------------------------------
 
-def _edsm_get_system(name: str) -> Optional[Dict[str, Any]]:
-    """Query EDSM for a single system, returning JSON if coordinates exist.
-
-    Returns None if the system is not known or has no coordinates recorded.
+class _Throttle:
+    """Enforce a minimum interval between request starts across threads."""
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self) -> None:
+        if self.interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def _edsm_get_systems_batch(names: List[str], throttle: Optional[_Throttle] = None,
+                            session: Optional[requests.Session] = None,
+                            ) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Query EDSM for several systems in one request.
+
+    Returns a mapping of requested name -> system JSON, for the systems EDSM
+    knows and has coordinates for. Names are matched case-insensitively.
+    Returns None if the request itself failed.
     """
-    params = {
-        "systemName": name,
-        "showCoordinates": 1,
-        "showPermit": 1,
-    }
+    params: List[Tuple[str, Any]] = [("systemName[]", n) for n in names]
+    params += [("showCoordinates", 1), ("showPermit", 1)]
+    if throttle is not None:
+        throttle.wait()
     try:
-        resp = requests.get(f"{EDSM_BASE}/system", params=params, timeout=10)
+        resp = (session or _session).get(f"{EDSM_BASE}/systems", params=params, timeout=30)
     except Exception as exc:  # network / DNS / etc
-        log.warning("EDSM request failed for %s: %s", name, exc)
+        log.warning("EDSM batch request failed for %d systems: %s", len(names), exc)
         return None
 
     if resp.status_code != 200:
-        log.warning("EDSM returned status %s for %s", resp.status_code, name)
+        log.warning("EDSM returned status %s for a batch of %d systems", resp.status_code, len(names))
         return None
 
     try:
-        data = resp.json()
+        data = _loads(resp.content)
     except Exception as exc:
-        log.warning("EDSM JSON decode failed for %s: %s", name, exc)
+        log.warning("EDSM JSON decode failed for a batch of %d systems: %s", len(names), exc)
         return None
 
-    if not data or "coords" not in data:
-        return None
-    return data
+    if not isinstance(data, list):  # EDSM answers {} when nothing matched
+        return {}
+
+    requested = {n.lower(): n for n in names}
+    out: Dict[str, Dict[str, Any]] = {}
+    for item in data:
+        name = requested.get(str(item.get("name") or "").lower())
+        if name is not None and item.get("coords"):
+            out[name] = item
+    return out
+
+
+def _edsm_cache_open(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path))
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS edsm_systems ("
+        " name TEXT PRIMARY KEY,"   # lower-cased system name
+        " fetched_at REAL NOT NULL,"
+        " payload TEXT"              # system JSON, NULL = known to be missing
+        ")"
+    )
+    return conn
+
+
+def _edsm_get_systems(
+    names: List[str],
+    rate_limit: float = EDSM_RATE_LIMIT_S,
+    cache_path: Optional[Path] = EDSM_CACHE,
+    session: Optional[requests.Session] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Look up many systems on EDSM using parallel batched requests.
+
+    Answers (including "not found") are kept in the SQLite cache at
+    *cache_path* for EDSM_CACHE_TTL_S, so re-runs only query EDSM for names
+    it has not answered recently. Pass cache_path=None to bypass the cache.
+    """
+    found: Dict[str, Dict[str, Any]] = {}
+    todo = names
+    conn = _edsm_cache_open(cache_path) if cache_path is not None else None
+    try:
+        if conn is not None:
+            cutoff = time.time() - EDSM_CACHE_TTL_S
+            cached = dict(conn.execute(
+                "SELECT name, payload FROM edsm_systems WHERE fetched_at >= ?", (cutoff,)
+            ))
+            todo = []
+            for n in names:
+                key = n.lower()
+                if key not in cached:
+                    todo.append(n)
+                elif cached[key] is not None:
+                    found[n] = _loads(cached[key])
+            log.info("EDSM cache: %d of %d systems answered locally", len(names) - len(todo), len(names))
+
+        batches = [todo[i:i + EDSM_BATCH_SIZE] for i in range(0, len(todo), EDSM_BATCH_SIZE)]
+        throttle = _Throttle(rate_limit)
+        now = time.time()
+        with ThreadPoolExecutor(max_workers=EDSM_MAX_WORKERS) as pool:
+            for batch, result in zip(
+                batches,
+                pool.map(lambda batch: _edsm_get_systems_batch(batch, throttle, session), batches),
+            ):
+                if result is None:
+                    continue  # failed request: don't cache, retry next run
+                found.update(result)
+                if conn is not None:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO edsm_systems (name, fetched_at, payload) VALUES (?, ?, ?)",
+                        [
+                            (n.lower(), now, json.dumps(result[n]) if n in result else None)
+                            for n in batch
+                        ],
+                    )
+        if conn is not None:
+            conn.commit()
+    finally:
+        if conn is not None:
+            conn.close()
+    return found
 
 
 def fill_missing_coords_from_edsm(
     csv_path: Path = SYSTEMS_CSV,
     dry_run: bool = False,
+    rate_limit: float = EDSM_RATE_LIMIT_S,
+    cache_path: Optional[Path] = EDSM_CACHE,
+    session: Optional[requests.Session] = None,
 ) -> int:
     """Fill in missing x/y/z coordinates for systems listed in *csv_path*.
 
-    Systems are looked up on EDSM by name. When coordinates are found, the
-    SystemNode is updated. If *dry_run* is True, changes are not written
-    back to disk but the number of updatable systems is still returned.
+    Systems are looked up on EDSM by name, in batches of EDSM_BATCH_SIZE
+    with up to EDSM_MAX_WORKERS requests in flight and at least
+    *rate_limit* seconds between request starts. Answers are cached on disk
+    at *cache_path* (None disables the cache). When coordinates are found,
+    the SystemNode is updated. If *dry_run* is True, changes are not
+    written back to disk but the number of updatable systems is still
+    returned. *session* overrides the module's shared HTTP session.
     """
     systems = load_systems_csv(csv_path)
     updated = 0
 
-    for s in systems:
-        if s.x is not None and s.y is not None and s.z is not None:
-            continue
+    missing = [s for s in systems if s.x is None or s.y is None or s.z is None]
+    if not missing:
+        return 0
+    found = _edsm_get_systems(list(dict.fromkeys(s.name for s in missing)), rate_limit, cache_path,
+                              session)
+    pending_notes: Dict[str, Dict[str, None]] = {}
 
-        data = _edsm_get_system(s.name)
+    for s in missing:
+        data = found.get(s.name)
         if not data:
             log.info("No EDSM entry for %s", s.name)
             continue
@@ -109,11 +262,17 @@ def fill_missing_coords_from_edsm(
             note_frag = f"Permit-locked"
             if permit_name:
                 note_frag += f" ({permit_name})"
-            if s.notes:
-                if note_frag not in s.notes:
-                    s.notes = s.notes + " " + note_frag
-            else:
-                s.notes = note_frag
+            pending_notes.setdefault(s.name, {})[note_frag] = None
+
+    # Apply collected note fragments once per system, skipping any the
+    # existing notes already contain.
+    for s in missing:
+        frags = pending_notes.get(s.name)
+        if not frags:
+            continue
+        parts = [s.notes] if s.notes else []
+        parts += [f for f in frags if not (s.notes and f in s.notes)]
+        s.notes = " ".join(parts)
 
     if not dry_run and updated:
         write_systems_csv(csv_path, systems)
@@ -128,18 +287,27 @@ def fill_missing_coords_from_edsm(
 def _iter_journal_events(journal_file: Path):
     """Yield parsed JSON events from a single Journal*.log file.
 
-    Lines that are not valid JSON are ignored.
+    The file is memory-mapped and split into byte lines, which are decoded
+    directly (with orjson when available) without building str lines first.
+    Lines with invalid UTF-8 are retried with the bad bytes dropped; lines
+    that are still not valid JSON are ignored.
     """
-    with journal_file.open("r", encoding="utf-8", errors="ignore") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                evt = json.loads(line)
-            except json.JSONDecodeError:
-                continue
-            yield evt
+    with journal_file.open("rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for line in iter(mm.readline, b""):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    evt = _loads(line)
+                except ValueError:  # JSONDecodeError for both json and orjson
+                    try:
+                        evt = _loads(line.decode("utf-8", "ignore"))
+                    except ValueError:
+                        continue
+                yield evt
 
 
 def _iter_jumps_from_journal(journal_file: Path):
@@ -172,6 +340,60 @@ def _coords_tuple(pos: Optional[List[float]]) -> Optional[Tuple[float, float, fl
     return float(pos[0]), float(pos[1]), float(pos[2])
 
 
+# Below these file counts the harvests run in-process. Starting a spawn pool
+# measured ~0.6 s (each worker re-imports __main__, which under the web
+# server pulls in Flask and SciPy), while a 1 MB journal parses in ~0.08 s
+# and a 20 KB lore text analyses in ~1.6 ms. Even with two workers the pool
+# only pays for itself past ~15 journals, or several hundred lore texts.
+_JOURNAL_POOL_MIN_FILES = 16
+_LORE_POOL_MIN_FILES = 512
+
+
+def _map_in_processes(fn: Callable[[Path], Any], files: List[Path],
+                      min_files: int) -> Iterator[Any]:
+    """Ordered map of *fn* over *files*, in worker processes when worthwhile.
+
+    Runs in-process with fewer than *min_files* files or only one CPU.
+    Workers are spawned rather than forked: callers such as the web server
+    are multi-threaded, and forking those is not safe.
+    """
+    workers = min(len(files), os.cpu_count() or 1)
+    if len(files) < min_files or workers <= 1:
+        yield from map(fn, files)
+        return
+    with ProcessPoolExecutor(max_workers=workers,
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        yield from pool.map(fn, files, chunksize=max(1, len(files) // (4 * workers)))
+
+
+def _parse_one_journal(journal_file: Path, cmdr_hint: Optional[str] = None) -> List[JumpEvent]:
+    """Return the FSDJump entries of one journal as JumpEvents (process-pool worker)."""
+    events: List[JumpEvent] = []
+    for evt, origin, dest, origin_pos, dest_pos in _iter_jumps_from_journal(journal_file):
+        ts = evt.get("timestamp")
+        ship = evt.get("Ship")
+        fsd = evt.get("FSDType")
+        cmdr = evt.get("Commander") or cmdr_hint
+        jump_dist = evt.get("JumpDist")
+
+        events.append(JumpEvent(
+            timestamp_utc=ts,
+            origin=origin,
+            destination=dest,
+            origin_coords=_coords_tuple(origin_pos),
+            destination_coords=_coords_tuple(dest_pos),
+            cargo=None,
+            ship=ship,
+            fsd_type=fsd,
+            notes=f"imported_from_journal:{journal_file.name}, cmdr={cmdr}, jump_dist={jump_dist}",
+            anomaly_visual=False,
+            anomaly_audio=False,
+            anomaly_duration=False,
+            extra={"raw": evt},
+        ))
+    return events
+
+
 def import_journals_to_witchspace(
     journal_dir: Path,
     cmdr_hint: Optional[str] = None,
@@ -181,6 +403,9 @@ def import_journals_to_witchspace(
 
     Returns the number of JumpEvents appended (or that *would* be appended
     if *dry_run* is True).
+
+    Large batches of journals are parsed in worker processes; events are
+    appended in sorted journal order, one append per journal file.
     """
     journal_files = sorted(journal_dir.glob("Journal*.log"))
     if not journal_files:
@@ -188,33 +413,13 @@ def import_journals_to_witchspace(
         return 0
 
     appended = 0
-    for jf in journal_files:
-        log.info("Scanning %s", jf)
-        for evt, origin, dest, origin_pos, dest_pos in _iter_jumps_from_journal(jf):
-            ts = evt.get("timestamp")
-            ship = evt.get("Ship")
-            fsd = evt.get("FSDType")
-            cmdr = evt.get("Commander") or cmdr_hint
-            jump_dist = evt.get("JumpDist")
-
-            event = JumpEvent(
-                timestamp_utc=ts,
-                origin=origin,
-                destination=dest,
-                origin_coords=_coords_tuple(origin_pos),
-                destination_coords=_coords_tuple(dest_pos),
-                cargo=None,
-                ship=ship,
-                fsd_type=fsd,
-                notes=f"imported_from_journal:{jf.name}, cmdr={cmdr}, jump_dist={jump_dist}",
-                anomaly_visual=False,
-                anomaly_audio=False,
-                anomaly_duration=False,
-                extra={"raw": evt},
-            )
-            if not dry_run:
-                append_jump_event(WITCHSPACE_LOG, event)
-            appended += 1
+    parsed = _map_in_processes(partial(_parse_one_journal, cmdr_hint=cmdr_hint),
+                               journal_files, _JOURNAL_POOL_MIN_FILES)
+    for jf, events in zip(journal_files, parsed):
+        log.info("Scanned %s", jf)
+        if events and not dry_run:
+            append_jump_events(WITCHSPACE_LOG, events)
+        appended += len(events)
 
     return appended
 
@@ -223,6 +428,16 @@ def import_journals_to_witchspace(
 # Lore indexing
 # ---------------------------------------------------------------------------
 
+def _analyze_one(path: Path) -> Dict[str, Any]:
+    """Run the basic lore analysis on one file (process-pool worker)."""
+    identifier = path.stem
+    title = identifier.replace("_", " ").title()
+    lore = load_lore_file(path, identifier=identifier, title=title, source="local_file")
+    features = report_basic_lore_analysis(lore)
+    features["filename"] = path.name
+    return features
+
+
 def index_lore_directory(
     lore_dir: Path = LORE_DIR,
     out_path: Path = DATA_DIR / "lore_features.jsonl",
@@ -233,6 +448,9 @@ def index_lore_directory(
     report_basic_lore_analysis() plus filename. This file is optional for
     the rest of the toolkit but is useful for debugging and for external
     tooling that wants structured lore features.
+
+    Large batches are analysed in worker processes; output keeps the
+    sorted file order.
     """
     files = sorted(lore_dir.glob("*.txt"))
     if not files:
@@ -241,15 +459,10 @@ def index_lore_directory(
 
     out_path.parent.mkdir(parents=True, exist_ok=True)
     count = 0
-    with out_path.open("w", encoding="utf-8") as out:
-        for path in files:
-            identifier = path.stem
-            title = identifier.replace("_", " ").title()
-            lore = load_lore_file(path, identifier=identifier, title=title, source="local_file")
-            features = report_basic_lore_analysis(lore)
-            features["filename"] = path.name
-            out.write(json.dumps(features) + "\n")
+    with out_path.open("wb") as out:
+        for features in _map_in_processes(_analyze_one, files, _LORE_POOL_MIN_FILES):
+            out.write(_dumps(features) + b"\n")
             count += 1
-            log.info("Indexed lore file %s", path.name)
+            log.info("Indexed lore file %s", features["filename"])
 
     return count
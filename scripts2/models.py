@@ -3,7 +3,7 @@ from dataclasses import dataclass
 from typing import Optional, Dict, Any, List, Tuple
 
 
-@dataclass
+@dataclass(slots=True)
 class SystemNode:
     """Represents a system or site in a hunt graph."""
     name: str
@@ -24,7 +24,7 @@ class SystemNode:
         return float(self.x), float(self.y), float(self.z)
 
 
-@dataclass
+@dataclass(slots=True)
 class JumpEvent:
     """
     Represents a single witch-space jump and any observed anomalies.
@@ -49,7 +49,7 @@ class JumpEvent:
     extra: Optional[Dict[str, Any]] = None     # anything else
 
 
-@dataclass
+@dataclass(slots=True)
 class LoreText:
     """Represents a piece of lore we want to analyze as potential cipher/map."""
     identifier: str
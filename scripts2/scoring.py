@@ -16,7 +16,7 @@ incomplete or stubbed logic, and all functions are ready for direct use.
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 from .config import SYSTEMS_CSV, WITCHSPACE_LOG, LORE_DIR
 from .data_io import load_systems_csv, load_jump_events
@@ -37,6 +37,11 @@ class ScoreBreakdown:
     anomalies: float
     total: float
 
+    @property
+    def rli(self) -> float:
+        """The total on the 0-100 scale shown to users."""
+        return self.total * 100.0
+
 
 def _build_system_lookup(systems: List[SystemNode]) -> Dict[str, SystemNode]:
     return {s.name: s for s in systems}
@@ -211,7 +216,23 @@ def score_systems_as_dict(
             "lore": b.lore,
             "anomalies": b.anomalies,
             "total": b.total,
-            "rli": b.total * 100.0,
+            "rli": b.rli,
         }
         for name, b in breakdowns.items()
     }
+
+
+def score_columns(
+    systems: Optional[List[SystemNode]] = None,
+    jumps: Optional[List[JumpEvent]] = None,
+) -> Dict[str, List[Any]]:
+    """Scores as parallel per-field lists (one entry per system), for the web console."""
+    breakdowns = score_systems(systems=systems, jumps=jumps)
+    values = breakdowns.values()
+    return {
+        "names": list(breakdowns),
+        "geometry": [b.geometry for b in values],
+        "lore": [b.lore for b in values],
+        "anomalies": [b.anomalies for b in values],
+        "rli": [b.rli for b in values],
+    }
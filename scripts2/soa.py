@@ -0,0 +1,54 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Iterable
+
+import numpy as np
+
+from .models import SystemNode
+
+
+@dataclass
+class SystemArray:
+    """
+    Structure-of-arrays view of a list of SystemNode objects.
+
+    Each field is its own contiguous array so the geometry kernels, which
+    only touch positions, read one dense (N, 3) block instead of chasing
+    N Python objects. Row i corresponds to the i-th node passed to
+    from_nodes(), so kernel results (row indices) map straight back to
+    the original list.
+
+    Positions are stored as float64, exactly as read, so results match the
+    per-node code.
+    """
+    names: np.ndarray       # (N,) object
+    xyz: np.ndarray         # (N, 3) float64, NaN where coords are missing
+    region: np.ndarray      # (N,) object, None where unset
+    category: np.ndarray    # (N,) object
+    coord_mask: np.ndarray  # (N,) bool, True where x/y/z are all present
+
+    @classmethod
+    def from_nodes(cls, nodes: Iterable[SystemNode]) -> "SystemArray":
+        nodes = list(nodes)
+        n = len(nodes)
+        names = np.empty(n, dtype=object)
+        region = np.empty(n, dtype=object)
+        category = np.empty(n, dtype=object)
+        xyz = np.full((n, 3), np.nan, dtype=np.float64)
+        coord_mask = np.zeros(n, dtype=bool)
+        for i, s in enumerate(nodes):
+            names[i] = s.name
+            region[i] = s.region
+            category[i] = s.category
+            if s.has_coords():
+                xyz[i] = s.coords()
+                coord_mask[i] = True
+        return cls(names=names, xyz=xyz, region=region, category=category,
+                   coord_mask=coord_mask)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def coord_rows(self) -> np.ndarray:
+        """Row indices of the systems that have coordinates, in order."""
+        return np.flatnonzero(self.coord_mask)
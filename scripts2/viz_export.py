@@ -4,7 +4,8 @@ from pathlib import Path
 from typing import List, Dict, Any, Tuple, Set
 
 from .models import SystemNode
-from .geometry import distance
+from .geometry import nearest_neighbor_indices
+from .soa import SystemArray
 
 
 def _serialize_node(s: SystemNode) -> Dict[str, Any]:
@@ -35,15 +36,10 @@ def _compute_knn_links(
     if len(coords_systems) < 2:
         return links
 
+    idx, dist = nearest_neighbor_indices(SystemArray.from_nodes(coords_systems).xyz, k)
     for i, s in enumerate(coords_systems):
-        dists: List[Tuple[float, SystemNode]] = []
-        for j, t in enumerate(coords_systems):
-            if i == j:
-                continue
-            d = distance(s, t)
-            dists.append((d, t))
-        dists.sort(key=lambda x: x[0])
-        for d, t in dists[:k]:
+        for j, d in zip(idx[i].tolist(), dist[i].tolist()):
+            t = coords_systems[j]
             a = min(s.name, t.name)
             b = max(s.name, t.name)
             links.append(
@@ -11,8 +11,9 @@ index_path = os.path.join(out_dir, "index.jsonl")
 os.makedirs(out_dir, exist_ok=True)
 
 # This is the header I suggested earlier: "# FILE: <path>"
-HEADER_PREFIX = "# FILE: "
-MAX_CHARS = 15000  # size of each chunk, tweak if you like
+# The dump is processed as raw bytes, so the prefix is bytes too.
+HEADER_PREFIX = b"# FILE: "
+MAX_BYTES = 15000  # size of each chunk in bytes, tweak if you like
 
 def safe_filename(path: str) -> str:
     """Turn a path like 'scripts/foo.py' into a safe filename."""
@@ -23,54 +24,69 @@ def safe_filename(path: str) -> str:
         repl = base[:140] + "__" + ext
     return repl
 
-current_file = None
-buffer = []
+def utf8_boundary(data, pos: int) -> int:
+    """Move *pos* back so it doesn't split a UTF-8 multi-byte character."""
+    start = pos
+    while pos > 0 and pos < len(data) and (data[pos] & 0xC0) == 0x80:
+        pos -= 1
+    # A chunk made only of continuation bytes (invalid input): cut anyway.
+    return pos if pos > 0 else start
 
-index_f = open(index_path, "w", encoding="utf-8")
+current_file = None
+buffer = bytearray()
+index_records = []
 
 def flush_current_file():
     """Write the buffered content for current_file into chunk files."""
     if current_file is None:
         return
-    if not buffer:
-        return
-
-    content = "".join(buffer)
-    if not content.strip():
+    if not buffer.strip():
         return
 
     safe = safe_filename(current_file)
+    view = memoryview(buffer)
 
-    for part_idx, start in enumerate(range(0, len(content), MAX_CHARS), start=1):
-        chunk = content[start:start + MAX_CHARS]
+    part_idx = 0
+    start = 0
+    while start < len(buffer):
+        stop = utf8_boundary(buffer, min(start + MAX_BYTES, len(buffer)))
+        part_idx += 1
         chunk_name = f"{safe}__part{part_idx}.txt"
         chunk_path = os.path.join(out_dir, chunk_name)
 
-        with open(chunk_path, "w", encoding="utf-8") as cf:
-            cf.write(chunk)
+        with open(chunk_path, "wb") as cf:
+            cf.write(view[start:stop])
 
         rec = {
             "source_path": current_file,   # original file path from the dump header
             "chunk_file": chunk_name,      # the chunk filename we just wrote
             "part": part_idx,              # part number of this file
         }
-        index_f.write(json.dumps(rec) + "\n")
+        index_records.append(json.dumps(rec).encode("utf-8") + b"\n")
+        start = stop
+
+    view.release()
 
-with open(dump_path, "r", encoding="utf-8", errors="ignore") as f:
+with open(dump_path, "rb") as f:
     for line in f:
         if line.startswith(HEADER_PREFIX):
             # We hit a new file header: flush the previous one
             flush_current_file()
 
             # Start a new logical file
-            current_file = line[len(HEADER_PREFIX):].strip()
-            buffer = []
+            current_file = line[len(HEADER_PREFIX):].strip().decode("utf-8", errors="ignore")
+            buffer.clear()
         else:
             if current_file is not None:
-                buffer.append(line)
+                # Match text-mode reading: normalise Windows line endings.
+                if line.endswith(b"\r\n"):
+                    line = line[:-2] + b"\n"
+                buffer += line
 
 # Flush the final file
 flush_current_file()
-index_f.close()
+
+with open(index_path, "wb") as index_f:
+    index_f.write(b"".join(index_records))
 
 print(f"Done. Chunks + index written under: {out_dir}")
@@ -18,22 +18,17 @@ def create_raxxla_hunt_map():
     fig = go.Figure()
 
     # --- 2. PLOT KEY LANDMARKS ---
-    # Plot Sol (Home)
+    # One trace for all landmarks; Sol (Home) is the first point.
+    names = list(locations)
+    P = np.stack(list(locations.values()))
     fig.add_trace(go.Scatter3d(
-        x=[locations["Sol"][0]], y=[locations["Sol"][1]], z=[locations["Sol"][2]],
-        mode='markers', marker=dict(size=8, color='yellow'),
-        name='Sol (Bubble Center)'
+        x=P[:, 0], y=P[:, 1], z=P[:, 2],
+        mode='markers+text', text=names, textposition='top center',
+        marker=dict(size=[8] + [10] * (len(P) - 1),
+                    color=['yellow'] + ['rgba(0,255,255,0.8)'] * (len(P) - 1)),
+        name='Landmarks (Sol = Bubble Center)'
     ))
 
-    # Plot The Nebulae & Zurara
-    for name, coords in locations.items():
-        if name != "Sol":
-            fig.add_trace(go.Scatter3d(
-                x=[coords[0]], y=[coords[1]], z=[coords[2]],
-                mode='markers', marker=dict(size=10, color='cyan', opacity=0.8),
-                name=name
-            ))
-
     # --- 3. CALCULATE SEARCH ZONES (THEORY IMPLEMENTATION) ---
 
     # ZONE A: "Brow of the Mother" (Cassiopeia Vector)
@@ -47,28 +42,27 @@ def create_raxxla_hunt_map():
     ))
     # Target Highlight: 1/3rd of the way out
     zone_a = hs_midpoint * 0.33
-    fig.add_trace(go.Scatter3d(
-        x=[zone_a[0]], y=[zone_a[1]], z=[zone_a[2]],
-        mode='markers', marker=dict(size=15, color='red', opacity=0.5, symbol='diamond'),
-        name='ZONE A: The Brow (Anchor System?)'
-    ))
 
     # ZONE B: "Vagabond Crossroads" (Triangle Center)
     # Centroid of Triangle: Sol, Heart Nebula, Zurara
     centroid = (locations["Sol"] + locations["Heart Nebula"] + locations["Zurara (Syreadiae JX-F c0)"]) / 3
-    fig.add_trace(go.Scatter3d(
-        x=[centroid[0]], y=[centroid[1]], z=[centroid[2]],
-        mode='markers', marker=dict(size=20, color='orange', opacity=0.4),
-        name='ZONE B: Vagabond Crossroads'
-    ))
 
     # ZONE C: "The Dark Heart" (Void between Heart & Soul)
     # Exact midpoint between Heart and Soul
     void_target = (locations["Heart Nebula"] + locations["Soul Nebula"]) / 2
+
+    # All zone markers in one trace; per-point opacity goes in the rgba colours.
+    Z = np.stack([zone_a, centroid, void_target])
     fig.add_trace(go.Scatter3d(
-        x=[void_target[0]], y=[void_target[1]], z=[void_target[2]],
-        mode='markers', marker=dict(size=12, color='purple', symbol='circle-open'),
-        name='ZONE C: The Void Between'
+        x=Z[:, 0], y=Z[:, 1], z=Z[:, 2],
+        mode='markers+text',
+        text=['ZONE A: The Brow (Anchor System?)',
+              'ZONE B: Vagabond Crossroads',
+              'ZONE C: The Void Between'],
+        marker=dict(size=[15, 20, 12],
+                    color=['rgba(255,0,0,0.5)', 'rgba(255,165,0,0.4)', 'purple'],
+                    symbol=['diamond', 'circle', 'circle-open']),
+        name='Search Zones'
     ))
 
     # --- 4. VISUAL STYLING (The "Conspiracy Board" Look) ---
@@ -1,23 +1,278 @@
 
 from __future__ import annotations
 
+import gzip
+import hashlib
 import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from flask import Flask, jsonify, request, render_template_string
-from apscheduler.schedulers.background import BackgroundScheduler
+import requests
+from flask import Flask, Response, current_app, jsonify, request
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import parse_accept_header, parse_etags, quote_etag
+
+try:  # optional: faster JSON responses
+    import orjson
+except ImportError:  # pragma: no cover - Flask's stdlib json provider is used instead
+    orjson = None
+
+try:  # optional: /api/scores.msgpack for machine clients
+    import msgpack
+except ImportError:  # pragma: no cover - the endpoint answers 501 instead
+    msgpack = None
+
+try:  # optional: brotli-compressed /api/scores responses
+    import brotli
+except ImportError:  # pragma: no cover - gzip or identity is used instead
+    brotli = None
 
 from omphalos_hunt.harvest import (
     fill_missing_coords_from_edsm,
     import_journals_to_witchspace,
     index_lore_directory,
+    make_http_session,
 )
-from omphalos_hunt.scoring import score_systems_as_dict
-from omphalos_hunt.config import SYSTEMS_CSV
+from omphalos_hunt.scoring import score_columns
+from omphalos_hunt.config import LORE_DIR, SYSTEMS_CSV, WITCHSPACE_LOG
 
 log = logging.getLogger(__name__)
 
+# Seconds a serialised /api/scores payload is served without re-checking
+# the input files' modification times.
+SCORES_TTL_S = 5.0
+
+# Fixed-point scale per /api/scores column: values go out as integers
+# (value * scale), matching the precision the console displays.
+SCORE_SCALE = {"geometry": 1000, "lore": 1000, "anomalies": 1000, "rli": 10}
+
+# Latest /api/scores snapshot (see _scores_snapshot). "version" is the data
+# version it was built from; the harvest endpoints bump _data_version to
+# invalidate it.
+_scores_cache: Dict[str, Any] = {"version": -1, "built_at": 0.0, "inputs": None}
+_scores_lock = threading.Lock()
+_data_version = 0
+
+
+def _bump_data_version() -> None:
+    global _data_version
+    with _scores_lock:
+        _data_version += 1
+
+
+def _is_fresh(cache: Dict[str, Any]) -> bool:
+    return (cache["version"] == _data_version
+            and time.monotonic() - cache["built_at"] < SCORES_TTL_S)
+
+
+def _mtime_ns(path: Path) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _scores_inputs_key() -> Tuple[Any, ...]:
+    """Modification times of every file the scores are computed from."""
+    lore = tuple(sorted((p.name, _mtime_ns(p)) for p in LORE_DIR.glob("*.txt")))
+    return _mtime_ns(SYSTEMS_CSV), _mtime_ns(WITCHSPACE_LOG), lore
+
+
+def _scores_snapshot() -> Dict[str, Any]:
+    """
+    Return the current scores snapshot, rebuilding it if stale.
+
+    A snapshot holds the payload, its JSON body and ETag, the body
+    precompressed by content-coding ("encoded") and, when msgpack is
+    installed, the msgpack body. Snapshots are replaced, never mutated, so
+    callers can read one outside the lock.
+    """
+    global _scores_cache
+    with _scores_lock:
+        cache = _scores_cache
+        if _is_fresh(cache):
+            return cache
+
+        version = _data_version
+        inputs = _scores_inputs_key()
+        if cache["version"] == version and cache["inputs"] == inputs:
+            # TTL ran out but no input file changed: keep the scores.
+            _scores_cache = {**cache, "built_at": time.monotonic()}
+            return _scores_cache
+
+        # Columnar: one list per field rather than one dict per system,
+        # presorted by RLI, highest first (stable, so ties keep CSV order).
+        # Each column is quantised and reordered in a single pass.
+        columns = score_columns()
+        rli_scale = SCORE_SCALE["rli"]
+        rli = [round(v * rli_scale) for v in columns["rli"]]
+        order = sorted(range(len(rli)), key=lambda i: -rli[i])
+        names = columns["names"]
+        payload: Dict[str, Any] = {"names": [names[i] for i in order]}
+        for field, scale in SCORE_SCALE.items():
+            column = columns[field]
+            payload[field] = [round(column[i] * scale) for i in order]
+        payload["scale"] = SCORE_SCALE
+        if orjson is not None:
+            body = orjson.dumps(payload)
+        else:
+            body = current_app.json.dumps(payload).encode("utf-8")
+        encoded = {"gzip": gzip.compress(body, compresslevel=6)}
+        if brotli is not None:
+            encoded["br"] = brotli.compress(body, quality=4)
+        _scores_cache = {
+            "version": version,
+            "built_at": time.monotonic(),
+            "inputs": inputs,
+            "payload": payload,
+            "bytes": body,
+            "etag": hashlib.blake2b(body, digest_size=16).hexdigest(),
+            "encoded": encoded,
+            "msgpack": msgpack.packb(payload, use_bin_type=True) if msgpack is not None else None,
+        }
+        return _scores_cache
+
+
+def _scores_response_parts(cache: Dict[str, Any], accept_encoding: str, if_none_match: str
+                           ) -> Tuple[int, List[Tuple[str, str]], bytes]:
+    """(status, headers, body) for /api/scores from a snapshot and the raw request headers."""
+    body, etag, encoded = cache["bytes"], cache["etag"], cache["encoded"]
+
+    coding = None
+    accept = parse_accept_header(accept_encoding)
+    for name in ("br", "gzip"):
+        if name in encoded and accept.quality(name) > 0:
+            coding = name
+            body = encoded[name]
+            etag = f"{etag}-{name}"  # distinct tag per representation
+            break
+
+    headers = [("ETag", quote_etag(etag)), ("Vary", "Accept-Encoding")]
+    if parse_etags(if_none_match).contains(etag):
+        return 304, headers, b""
+    headers += [("Content-Type", "application/json"), ("Content-Length", str(len(body)))]
+    if coding is not None:
+        headers.append(("Content-Encoding", coding))
+    return 200, headers, body
+
+
+class _ScoresFastPath:
+    """
+    WSGI middleware answering GET /api/scores straight from a warm snapshot.
+
+    Skips Flask's routing, request context and response objects; cold or
+    stale snapshots fall through to the regular view, which rebuilds them.
+    """
+
+    def __init__(self, wsgi_app: Callable) -> None:
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ: Dict[str, Any], start_response: Callable):
+        if environ.get("PATH_INFO") == "/api/scores" and environ.get("REQUEST_METHOD") == "GET":
+            cache = _scores_cache
+            if _is_fresh(cache):
+                status, headers, body = _scores_response_parts(
+                    cache, environ.get("HTTP_ACCEPT_ENCODING", ""), environ.get("HTTP_IF_NONE_MATCH", ""))
+                start_response("200 OK" if status == 200 else "304 Not Modified", headers)
+                return [body]
+        return self.wsgi_app(environ, start_response)
+
+
+# Harvest jobs run here so the request handlers return immediately.
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="harvest")
+# Job id -> (future, time submitted). Finished jobs nobody polls are dropped
+# after JOB_TTL_S.
+_jobs: Dict[str, Tuple[Future, float]] = {}
+_jobs_lock = threading.Lock()
+JOB_TTL_S = 3600
+
+
+# In-flight harvests by key, so concurrent requests for the same harvest
+# share one run instead of starting another.
+_inflight: Dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+
+
+def _singleflight(key: str, fn: Callable[[], str]) -> Future:
+    """Return the running future for *key*, or start *fn* under that key."""
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is not None:
+            return future
+        future = _executor.submit(fn)
+        _inflight[key] = future
+
+    def clear(f: Future) -> None:
+        with _inflight_lock:
+            if _inflight.get(key) is f:
+                del _inflight[key]
+
+    # Outside the lock: the callback runs at once if fn already finished.
+    future.add_done_callback(clear)
+    return future
+
+
+def _submit_job(key: str, fn: Callable[[], str]) -> str:
+    """Run *fn* (which returns a status message) in the background; return a job id.
+
+    Callers that arrive while a job with the same *key* is running get their
+    own job id for that same run.
+    """
+    jid = uuid.uuid4().hex
+    future = _singleflight(key, fn)
+    now = time.monotonic()
+    with _jobs_lock:
+        for old in [j for j, (f, t) in _jobs.items() if f.done() and now - t > JOB_TTL_S]:
+            del _jobs[old]
+        _jobs[jid] = (future, now)
+    return jid
+
+
+# Seconds between runs of the daily background jobs.
+DAILY_INTERVAL_S = 86400
+
+
+def _daily_loop(session: requests.Session) -> None:
+    """Refresh EDSM coordinates and the lore index once a day, forever."""
+    while True:
+        time.sleep(DAILY_INTERVAL_S)
+        try:
+            _singleflight("coords", partial(_harvest_coords, session)).result()
+        except Exception:
+            log.exception("Daily coordinate harvest failed")
+        try:
+            index_lore_directory()
+        except Exception:
+            log.exception("Daily lore index failed")
+
+
+def _harvest_coords(session: requests.Session) -> str:
+    updated = fill_missing_coords_from_edsm(SYSTEMS_CSV, dry_run=False, session=session)
+    _bump_data_version()
+    return f"Updated coordinates for {updated} systems."
+
+
+def _harvest_journals(journal_dir: Path) -> str:
+    # Checked here rather than in the request, which must not touch the disk.
+    if not journal_dir.exists():
+        raise FileNotFoundError(f"Journal dir not found: {journal_dir}")
+    count = import_journals_to_witchspace(journal_dir, cmdr_hint=None, dry_run=False)
+    _bump_data_version()
+    return f"Imported {count} jumps from journals."
+
+
+def _harvest_lore() -> str:
+    count = index_lore_directory()
+    _bump_data_version()
+    return f"Indexed {count} lore files."
+
+
 # Very small HTML template – intentionally minimal but functional.
 INDEX_HTML = """
 <!doctype html>
@@ -72,9 +327,19 @@ INDEX_HTML = """
       async function doHarvest(kind) {
         setStatus("Running " + kind + " harvest…");
         const resp = await fetch("/api/harvest/" + kind, {method:"POST"});
-        const data = await resp.json();
+        let data = await resp.json();
+        // Harvests run in the background; poll the job until it finishes.
+        while (data.job_id && data.status !== "done" && data.status !== "error") {
+          await new Promise(r => setTimeout(r, 1000));
+          const jobResp = await fetch("/api/jobs/" + data.job_id);
+          if (!jobResp.ok) {
+            data = await jobResp.json().catch(() => ({message: "Job status unavailable."}));
+            break;
+          }
+          data = Object.assign(await jobResp.json(), {job_id: data.job_id});
+        }
         setStatus(data.message || "Done.");
-        if (kind !== "lore") {
+        if (kind !== "lore" && data.status === "done") {
           refreshScores();
         }
       }
@@ -85,15 +350,17 @@ INDEX_HTML = """
         const data = await resp.json();
         const tbody = document.querySelector("#scores tbody");
         tbody.innerHTML = "";
-        data.systems.sort((a, b) => b.rli - a.rli);
-        for (const row of data.systems) {
+        // Columns arrive as parallel arrays of fixed-point integers
+        // (value * data.scale[column]), already sorted by RLI.
+        const s = data.scale;
+        for (let i = 0; i < data.names.length; i++) {
           const tr = document.createElement("tr");
           tr.innerHTML =
-            "<td>" + row.name + "</td>" +
-            "<td>" + row.geometry.toFixed(3) + "</td>" +
-            "<td>" + row.lore.toFixed(3) + "</td>" +
-            "<td>" + row.anomalies.toFixed(3) + "</td>" +
-            "<td>" + row.rli.toFixed(1) + "</td>";
+            "<td>" + data.names[i] + "</td>" +
+            "<td>" + (data.geometry[i] / s.geometry).toFixed(3) + "</td>" +
+            "<td>" + (data.lore[i] / s.lore).toFixed(3) + "</td>" +
+            "<td>" + (data.anomalies[i] / s.anomalies).toFixed(3) + "</td>" +
+            "<td>" + (data.rli[i] / s.rli).toFixed(1) + "</td>";
           tbody.appendChild(tr);
         }
         setStatus("Scores updated.");
@@ -107,80 +374,129 @@ INDEX_HTML = """
 """
 
 
+def _minify_html(html: str) -> str:
+    """Drop indentation and blank lines; line breaks stay so the inline JS is unaffected."""
+    return "\n".join(line.strip() for line in html.splitlines() if line.strip())
+
+
+# INDEX_HTML has no template variables, so it is minified and encoded once
+# (plain and gzipped) and served as-is.
+_INDEX_BYTES = _minify_html(INDEX_HTML).encode("utf-8")
+_INDEX_GZ = gzip.compress(_INDEX_BYTES, compresslevel=9)
+
+
+class OrJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson (used by jsonify and request.get_json)."""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+
+# ---------------------------------------------------------------------------
+# Route handlers (registered on the app in create_app)
+# ---------------------------------------------------------------------------
+
+def index() -> Response:
+    resp = Response(_INDEX_BYTES, mimetype="text/html",
+                    headers={"Cache-Control": "public, max-age=3600"})
+    if request.accept_encodings.quality("gzip") > 0:
+        resp.set_data(_INDEX_GZ)
+        resp.headers["Content-Encoding"] = "gzip"
+    resp.vary.add("Accept-Encoding")
+    return resp
+
+
+def api_h_coords():
+    job = partial(_harvest_coords, current_app.config["HTTP_SESSION"])
+    return jsonify({"ok": True, "job_id": _submit_job("coords", job)}), 202
+
+
+def api_h_journals():
+    # Journal path must be supplied by user per-call for safety.
+    payload: Dict[str, Any] = request.get_json(silent=True) or {}
+    journal_dir_raw = payload.get("journal_dir")
+    if not journal_dir_raw:
+        return jsonify({
+            "ok": False,
+            "message": "journal_dir not supplied; call with JSON {\"journal_dir\": \"path/to/Journal\"}.",
+        }), 400
+    journal_dir = Path(journal_dir_raw).expanduser()
+    jid = _submit_job(f"journals:{journal_dir}", partial(_harvest_journals, journal_dir))
+    return jsonify({"ok": True, "job_id": jid}), 202
+
+
+def api_h_lore():
+    return jsonify({"ok": True, "job_id": _submit_job("lore", _harvest_lore)}), 202
+
+
+def api_job(jid: str):
+    with _jobs_lock:
+        future, _ = _jobs.get(jid, (None, 0.0))
+        if future is not None and future.done():
+            # Finished jobs are reported once, then forgotten.
+            del _jobs[jid]
+    if future is None:
+        return jsonify({"ok": False, "message": f"Unknown job: {jid}"}), 404
+    if not future.done():
+        return jsonify({"ok": True, "status": "pending"})
+    exc = future.exception()
+    if exc is not None:
+        log.error("Harvest job %s failed: %s", jid, exc)
+        return jsonify({"ok": False, "status": "error", "message": f"Job failed: {exc}"})
+    return jsonify({"ok": True, "status": "done", "message": future.result()})
+
+
+def api_scores():
+    status, headers, body = _scores_response_parts(
+        _scores_snapshot(),
+        request.headers.get("Accept-Encoding", ""),
+        request.headers.get("If-None-Match", ""),
+    )
+    return Response(body, status=status, headers=headers)
+
+
+def api_scores_msgpack():
+    """Same payload as /api/scores, msgpack-encoded, for programmatic clients."""
+    if msgpack is None:
+        return jsonify({"ok": False, "message": "msgpack is not installed on the server."}), 501
+    cache = _scores_snapshot()
+    etag = f"{cache['etag']}-msgpack"
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        resp = Response(cache["msgpack"], mimetype="application/msgpack")
+    resp.set_etag(etag)
+    return resp
+
+
 def create_app() -> Flask:
     app = Flask(__name__)
+    if orjson is not None:
+        app.json = OrJSONProvider(app)
+
+    # One keep-alive HTTP session for all EDSM traffic from this app.
+    app.config["HTTP_SESSION"] = make_http_session()
+
+    # Daily background jobs (Flask 3 no longer has before_first_request).
+    threading.Thread(target=_daily_loop, args=(app.config["HTTP_SESSION"],),
+                     name="daily-jobs", daemon=True).start()
+    log.info("Daily job thread started.")
 
-    # Scheduler for periodic background jobs.
-    scheduler = BackgroundScheduler(daemon=True)
-
-    # Start scheduler immediately (Flask 3 no longer has before_first_request)
-    if not scheduler.running:
-        # Run once a day
-        scheduler.add_job(
-            lambda: fill_missing_coords_from_edsm(SYSTEMS_CSV, dry_run=False),
-            "interval",
-            days=1,
-            id="coords",
-            replace_existing=True,
-        )
-        # Run lore index daily
-        scheduler.add_job(
-            index_lore_directory,
-            "interval",
-            days=1,
-            id="lore",
-            replace_existing=True,
-        )
-        scheduler.start()
-        log.info("BackgroundScheduler started.")
-
-
-    @app.route("/")
-    def index() -> str:
-        return render_template_string(INDEX_HTML)
-
-    @app.route("/api/harvest/coords", methods=["POST"])
-    def api_h_coords():
-        updated = fill_missing_coords_from_edsm(SYSTEMS_CSV, dry_run=False)
-        return jsonify({"ok": True, "message": f"Updated coordinates for {updated} systems."})
-
-    @app.route("/api/harvest/journals", methods=["POST"])
-    def api_h_journals():
-        # Journal path must be supplied by user per-call for safety.
-        payload: Dict[str, Any] = request.get_json(silent=True) or {}
-        journal_dir_raw = payload.get("journal_dir")
-        if not journal_dir_raw:
-            return jsonify({
-                "ok": False,
-                "message": "journal_dir not supplied; call with JSON {\"journal_dir\": \"path/to/Journal\"}.",
-            }), 400
-        journal_dir = Path(journal_dir_raw).expanduser()
-        if not journal_dir.exists():
-            return jsonify({"ok": False, "message": f"Journal dir not found: {journal_dir}"}), 400
-        count = import_journals_to_witchspace(journal_dir, cmdr_hint=None, dry_run=False)
-        return jsonify({"ok": True, "message": f"Imported {count} jumps from journals."})
-
-
-    @app.route("/api/harvest/lore", methods=["POST"])
-    def api_h_lore():
-        count = index_lore_directory()
-        return jsonify({"ok": True, "message": f"Indexed {count} lore files."})
-
-    @app.route("/api/scores", methods=["GET"])
-    def api_scores():
-        scores = score_systems_as_dict()
-        systems_rows = [
-            {
-                "name": name,
-                "geometry": v["geometry"],
-                "lore": v["lore"],
-                "anomalies": v["anomalies"],
-                "rli": v["rli"],
-            }
-            for name, v in scores.items()
-        ]
-        return jsonify({"systems": systems_rows})
+    app.wsgi_app = _ScoresFastPath(app.wsgi_app)
 
+    app.add_url_rule("/", view_func=index)
+    app.add_url_rule("/api/harvest/coords", view_func=api_h_coords, methods=["POST"])
+    app.add_url_rule("/api/harvest/journals", view_func=api_h_journals, methods=["POST"])
+    app.add_url_rule("/api/harvest/lore", view_func=api_h_lore, methods=["POST"])
+    app.add_url_rule("/api/jobs/<jid>", view_func=api_job, methods=["GET"])
+    app.add_url_rule("/api/scores", view_func=api_scores, methods=["GET"])
+    app.add_url_rule("/api/scores.msgpack", view_func=api_scores_msgpack, methods=["GET"])
     return app
 
 